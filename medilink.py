@@ -12,9 +12,16 @@ import datetime as dt
 import json
 import os
 import random
-import re
-import urllib.parse
-from typing import List, Dict, Any, Tuple
+import stat
+import uuid
+from functools import lru_cache
+import numpy as np
+from typing import List, Dict, Any, Tuple, Iterator
+
+try:
+    import orjson  # optional: faster JSON (de)serialization
+except ImportError:
+    orjson = None
 
 # ---------------------------
 # Config / Paths
@@ -22,7 +29,13 @@ from typing import List, Dict, Any, Tuple
 st.set_page_config(page_title="MediLink – Health Access App", layout="wide")
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(APP_DIR, "medilink_data")
-os.makedirs(DATA_DIR, exist_ok=True)
+
+@st.cache_resource
+def _ensure_dirs():
+    # once per process, not on every rerun
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+_ensure_dirs()
 
 CONTACTS_FILE = os.path.join(DATA_DIR, "contacts.json")
 REMINDERS_FILE = os.path.join(DATA_DIR, "reminders.json")
@@ -46,23 +59,79 @@ DAILY_TIPS = [
 # ---------------------------
 # JSON helpers
 # ---------------------------
+if orjson is not None:
+    _loads = orjson.loads
+
+    def _dumps(data) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+else:
+    _loads = json.loads
+
+    def _dumps(data) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
 def _read_json(path: str, fallback):
     try:
-        if not os.path.exists(path):
-            _write_json(path, fallback)
-            return fallback
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return _loads(f.read())
+    except FileNotFoundError:
+        _write_json(path, fallback)
+        return fallback
     except Exception:
         return fallback
 
+def _replace_file(path: str, payload: bytes):
+    # Write to a unique temp file and rename so a failed or concurrent save
+    # (sessions are threads in one process) can't truncate the data.
+    # Mode 0o666 lets the umask apply, as open(path, "w") would; an existing
+    # file keeps its own mode.
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
 def _write_json(path: str, data):
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        payload = _dumps(data)
+        try:
+            with open(path, "rb") as f:
+                if f.read() == payload:
+                    return
+        except FileNotFoundError:
+            pass
+        try:
+            _replace_file(path, payload)
+        except FileNotFoundError:
+            # data dir removed while running; _ensure_dirs only runs once per process
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _replace_file(path, payload)
     except Exception as e:
         st.error(f"Could not save file {os.path.basename(path)}: {e}")
 
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return -1.0
+
+# Keyed on mtime so external edits are picked up; savers clear it explicitly.
+# Bounded because each external edit adds a new (path, mtime) entry.
+@st.cache_data(max_entries=64)
+def _load_cached(path: str, mtime: float, fallback):
+    return _read_json(path, fallback)
+
 # ---------------------------
 # Contacts persistence
 # ---------------------------
@@ -71,44 +140,61 @@ DEFAULT_CONTACTS = [
 ]
 
 def load_contacts() -> List[Dict[str,str]]:
-    data = _read_json(CONTACTS_FILE, DEFAULT_CONTACTS)
+    data = _load_cached(CONTACTS_FILE, _mtime(CONTACTS_FILE), DEFAULT_CONTACTS)
     if isinstance(data, list):
         return data
     return DEFAULT_CONTACTS
 
 def save_contacts(contacts: List[Dict[str,str]]):
     _write_json(CONTACTS_FILE, contacts)
+    _load_cached.clear()
 
 # ---------------------------
 # Reminders persistence
 # ---------------------------
 def load_reminders() -> List[Dict[str,Any]]:
-    data = _read_json(REMINDERS_FILE, [])
+    data = _load_cached(REMINDERS_FILE, _mtime(REMINDERS_FILE), [])
     if isinstance(data, list):
         return data
     return []
 
 def save_reminders(reminders: List[Dict[str,Any]]):
     _write_json(REMINDERS_FILE, reminders)
+    _load_cached.clear()
 
 # ---------------------------
 # Phone / Message helpers
 # ---------------------------
+# str.translate tables that delete every ASCII char outside the allowed set;
+# non-ASCII input takes the per-character path to keep the same results
+_TEL_ALLOWED = "+0123456789"
+_TEL_DELETE = str.maketrans("", "", "".join(chr(i) for i in range(128) if chr(i) not in _TEL_ALLOWED))
+_WA_DELETE = str.maketrans("", "", "".join(chr(i) for i in range(128) if not chr(i).isdigit()))
+
+@lru_cache(maxsize=256)
 def normalize_phone_for_tel(num: str) -> str:
     num = (num or "").strip()
-    allowed = "+0123456789"
-    cleaned = "".join(ch for ch in num if ch in allowed)
+    if num.isascii():
+        cleaned = num.translate(_TEL_DELETE)
+    else:
+        cleaned = "".join(ch for ch in num if ch in _TEL_ALLOWED)
     return cleaned or num
 
+@lru_cache(maxsize=256)
 def normalize_phone_for_whatsapp(num: str) -> str:
-    return "".join(ch for ch in (num or "") if ch.isdigit())
+    num = num or ""
+    if num.isascii():
+        return num.translate(_WA_DELETE)
+    return "".join(ch for ch in num if ch.isdigit())
 
+@lru_cache(maxsize=256)
 def google_maps_link(lat: str, lon: str) -> str:
     lat = (lat or "").strip()
     lon = (lon or "").strip()
     if not lat or not lon:
         return ""
-    return f"https://maps.google.com/?q={urllib.parse.quote(lat)},{urllib.parse.quote(lon)}"
+    from urllib.parse import quote  # lazy: only the Emergency page builds links
+    return f"https://maps.google.com/?q={quote(lat)},{quote(lon)}"
 
 def build_message(user_msg: str, lat: str, lon: str) -> str:
     base = (user_msg or "").strip() or "Emergency! Please help."
@@ -117,36 +203,51 @@ def build_message(user_msg: str, lat: str, lon: str) -> str:
         base += f"\nMy location: {maps}"
     return base
 
-def whatsapp_link(phone: str, message: str) -> str:
+def quote_message(message: str) -> str:
+    # percent-encode once per render; the result feeds both link builders below
+    from urllib.parse import quote
+    return quote(message or "")
+
+def whatsapp_link(phone: str, quoted_message: str) -> str:
     num = normalize_phone_for_whatsapp(phone)
-    text = urllib.parse.quote(message or "")
     if not num:
         return ""
-    return f"https://wa.me/{num}?text={text}"
+    return f"https://wa.me/{num}?text={quoted_message}"
 
-def sms_link(phone: str, message: str) -> str:
+def sms_link(phone: str, quoted_message: str) -> str:
     tel = normalize_phone_for_tel(phone)
-    body = urllib.parse.quote(message or "")
     if not tel:
         return ""
-    return f"sms:{tel}?&body={body}"
+    return f"sms:{tel}?&body={quoted_message}"
 
 # ---------------------------
 # Reminders utilities
 # ---------------------------
 def _parse_time_str(t: str) -> Tuple[int,int]:
-    m = re.match(r"^(\d{1,2}):(\d{2})$", t or "")
-    if not m:
+    # "H:MM" / "HH:MM" only; plain str checks are cheaper than a regex here
+    h, sep, m = (t or "").partition(":")
+    if not sep or not (1 <= len(h) <= 2 and len(m) == 2 and h.isdecimal() and m.isdecimal()):
         return (8,0)
-    hh = max(0, min(23, int(m.group(1))))
-    mm = max(0, min(59, int(m.group(2))))
+    hh = max(0, min(23, int(h)))
+    mm = max(0, min(59, int(m)))
     return (hh, mm)
 
+def reminder_minutes(reminders: List[Dict[str,Any]]) -> List[int]:
+    # minutes after midnight for each reminder; cheaper to parse than to cache
+    return [hh * 60 + mm for hh, mm in (_parse_time_str(r.get("time","08:00")) for r in reminders)]
+
+def due_mask(minutes_list: List[int], now: dt.datetime, tolerance_minutes: int = 2) -> List[bool]:
+    n = now.hour * 60 + now.minute + (now.second + now.microsecond / 1e6) / 60.0
+    mask = []
+    for m in minutes_list:
+        delta = abs(m - n)
+        # wrap around midnight (23:59 is one minute from 00:00)
+        mask.append(min(delta, 1440 - delta) <= tolerance_minutes)
+    return mask
+
 def is_due_now(rem: Dict[str,Any], now: dt.datetime, tolerance_minutes: int = 2) -> bool:
     hh, mm = _parse_time_str(rem.get("time","08:00"))
-    due = now.replace(hour=hh, minute=mm, second=0, microsecond=0)
-    delta = abs((now - due).total_seconds()) / 60.0
-    return (delta <= tolerance_minutes)
+    return due_mask([hh * 60 + mm], now, tolerance_minutes)[0]
 
 # ---------------------------
 # Symptom Checker data
@@ -236,47 +337,81 @@ CONDITIONS = {
     }
 }
 
-def score_conditions(selected: List[str]) -> List[Tuple[str,int,str,int]]:
-    sel = set(selected)
-    results = []
-    for cond, spec in CONDITIONS.items():
-        score = 0
-        for s,w in spec["weights"].items():
-            # Accept some mapping: allow 'shortness of breath' and 'difficulty breathing' synonyms
-            if s in sel:
-                score += w
-            else:
-                # synonyms mapping
-                if s == "shortness of breath" and "difficulty breathing" in sel:
-                    score += w
-                if s == "difficulty breathing" and "shortness of breath" in sel:
-                    score += w
-                if s == "persistent cough" and "cough" in sel and "persistent cough" not in sel:
-                    # small allowance: cough could be persistent
-                    score += int(w/2)
-        results.append((cond, score, spec["advice"], spec["threshold"]))
-    results.sort(key=lambda x: x[1], reverse=True)
+# Scoring is a dense (conditions x symptoms) weight matrix times a 0/1 vector.
+# Synonyms share a column, so selecting either (or both) counts once.
+_SYMPTOM_SYNONYMS = {"difficulty breathing": "shortness of breath"}
+# Derived column: plain "cough" earns half the "persistent cough" weight,
+# but only when "persistent cough" itself is not selected.
+_COUGH_ONLY = "cough (not persistent)"
+
+def _canonical(symptom: str) -> str:
+    return _SYMPTOM_SYNONYMS.get(symptom, symptom)
+
+_SYMPTOM_COLS: List[str] = list(dict.fromkeys(
+    [_canonical(s) for s in SYMPTOMS]
+    + [_canonical(s) for spec in CONDITIONS.values() for s in spec["weights"]]
+    + [_COUGH_ONLY]
+))
+_SYMPTOM_IDX: Dict[str,int] = {s: i for i, s in enumerate(_SYMPTOM_COLS)}
+_SYMPTOM_IDX.update({s: _SYMPTOM_IDX[c] for s, c in _SYMPTOM_SYNONYMS.items()})
+
+_COND_NAMES: List[str] = list(CONDITIONS)
+_COND_ADVICE: List[str] = [spec["advice"] for spec in CONDITIONS.values()]
+_COND_THRESH: List[int] = [spec["threshold"] for spec in CONDITIONS.values()]
+_W = np.zeros((len(_COND_NAMES), len(_SYMPTOM_COLS)), dtype=np.int32)
+for _i, _spec in enumerate(CONDITIONS.values()):
+    for _s, _w in _spec["weights"].items():
+        _W[_i, _SYMPTOM_IDX[_s]] += _w
+        if _s == "persistent cough":
+            _W[_i, _SYMPTOM_IDX[_COUGH_ONLY]] += int(_w/2)
+del _i, _spec, _s, _w
+
+def _selection_key(selected: List[str]) -> Tuple[str,...]:
+    # order-independent cache key for a symptom selection
+    return tuple(sorted(set(selected)))
+
+# Both checkers take the key from _selection_key, built once per Analyze click
+@st.cache_data(max_entries=256)
+def score_conditions(selected: Tuple[str,...]) -> List[Tuple[str,int,str,int]]:
+    x = np.zeros(len(_SYMPTOM_COLS), dtype=np.int32)
+    for s in selected:
+        idx = _SYMPTOM_IDX.get(s)
+        if idx is not None:
+            x[idx] = 1
+    if "cough" in selected and "persistent cough" not in selected:
+        x[_SYMPTOM_IDX[_COUGH_ONLY]] = 1
+    scores = (_W @ x).tolist()
+    results = list(zip(_COND_NAMES, scores, _COND_ADVICE, _COND_THRESH))
+    results.sort(key=lambda r: r[1], reverse=True)
     return results
 
-def red_flag_messages(selected: List[str]) -> List[str]:
-    msgs = []
-    sel = set(selected)
-    # check known keys and some mappings
-    for key, msg in RED_FLAGS.items():
-        if key in sel:
-            msgs.append(msg)
-        # map phrases
-        if key == "persistent vomiting" and "vomiting" in sel:
-            msgs.append(msg)
-        if key == "severe abdominal pain" and "abdominal pain" in sel:
-            msgs.append(msg)
-        if key == "sudden weakness or slurred speech":
-            if "dizziness" in sel or "slurred speech" in sel or "sudden weakness" in sel:
-                msgs.append(msg)
+# Selected symptoms that also raise a RED_FLAGS entry under another name
+_RED_FLAG_ALIASES = {
+    "vomiting": "persistent vomiting",
+    "abdominal pain": "severe abdominal pain",
+    "dizziness": "sudden weakness or slurred speech",
+    "slurred speech": "sudden weakness or slurred speech",
+    "sudden weakness": "sudden weakness or slurred speech",
+}
+_SYMPTOM_TO_FLAGS: Dict[str, List[str]] = {key: [msg] for key, msg in RED_FLAGS.items()}
+for _s, _key in _RED_FLAG_ALIASES.items():
+    _SYMPTOM_TO_FLAGS.setdefault(_s, []).append(RED_FLAGS[_key])
+del _s, _key
+# messages are reported in RED_FLAGS order regardless of selection order
+_FLAG_RANK: Dict[str,int] = {msg: i for i, msg in enumerate(RED_FLAGS.values())}
+_COMBO_FLAG = "Combination of chest pain and breathing difficulty — this may be life-threatening."
+
+@st.cache_data(max_entries=256)
+def red_flag_messages(selected: Tuple[str,...]) -> List[str]:
+    seen = {}
+    for s in selected:
+        for msg in _SYMPTOM_TO_FLAGS.get(s, ()):
+            seen[msg] = None
+    msgs = sorted(seen, key=_FLAG_RANK.__getitem__)
     # manual check for chest pain + shortness of breath combo
-    if ("chest pain" in sel) and ("difficulty breathing" in sel or "shortness of breath" in sel):
-        msgs.append("Combination of chest pain and breathing difficulty — this may be life-threatening.")
-    return list(dict.fromkeys(msgs))  # unique
+    if ("chest pain" in selected) and ("difficulty breathing" in selected or "shortness of breath" in selected):
+        msgs.append(_COMBO_FLAG)
+    return msgs
 
 # ---------------------------
 # Health Library data
@@ -346,15 +481,29 @@ HEALTH_LIBRARY: Dict[str, Dict[str, Any]] = {
     }
 }
 
+def _flatten(content: Any) -> Iterator[str]:
+    # yield every string leaf of a library entry (nested dicts/lists)
+    if isinstance(content, str):
+        yield content
+    elif isinstance(content, dict):
+        for v in content.values():
+            yield from _flatten(v)
+    elif isinstance(content, (list, tuple)):
+        for v in content:
+            yield from _flatten(v)
+
+# The library is static, so build the lowercase search text once at import.
+# Only titles and text are indexed; field names ("tips", "steps", ...) are not.
+_LIBRARY_INDEX: List[Tuple[str,str,str]] = [
+    (cat, topic, (topic + " " + " ".join(_flatten(content))).lower())
+    for cat, topics in HEALTH_LIBRARY.items()
+    for topic, content in topics.items()
+]
+
+@st.cache_data(max_entries=256)
 def search_library(query: str) -> List[Tuple[str,str]]:
-    results = []
     q = (query or "").strip().lower()
-    for cat, topics in HEALTH_LIBRARY.items():
-        for topic, content in topics.items():
-            blob = (topic + " " + json.dumps(content)).lower()
-            if not q or q in topic.lower() or q in blob:
-                results.append((cat, topic))
-    return results
+    return [(cat, topic) for cat, topic, blob in _LIBRARY_INDEX if not q or q in blob]
 
 # ---------------------------
 # UI / Pages
@@ -407,8 +556,8 @@ if menu == "Home":
 
     # Show due reminders (in-app alert)
     reminders = load_reminders()
-    now = dt.datetime.now()
-    due_list = [r for r in reminders if is_due_now(r, now)]
+    due = due_mask(reminder_minutes(reminders), dt.datetime.now())
+    due_list = [r for r, d in zip(reminders, due) if d]
     if due_list:
         st.warning("🔔 **Medication Due Now**")
         for r in due_list:
@@ -421,23 +570,29 @@ elif menu == "Symptom Checker":
 
     selected = st.multiselect("Your symptoms:", SYMPTOMS, default=[])
     if st.button("Analyze"):
-        flags = red_flag_messages(selected)
+        sel_key = _selection_key(selected)
+        # reuse the last analysis while the selection is unchanged
+        if st.session_state.get("_sym_key") != sel_key:
+            st.session_state._sym_key = sel_key
+            st.session_state._sym_res = (red_flag_messages(sel_key), score_conditions(sel_key))
+        flags, results = st.session_state._sym_res
         if flags:
-            with st.container():
-                st.error("🚨 **Red Flags Detected** — consider urgent care:")
-                for f in flags:
-                    st.write(f"- {f}")
-                st.write("If symptoms are severe or worsening, seek emergency help (call 112).")
+            # one element per block instead of one st call per line
+            bullets = "\n".join(f"- {f}" for f in flags)
+            st.error(
+                "🚨 **Red Flags Detected** — consider urgent care:\n\n"
+                f"{bullets}\n\n"
+                "If symptoms are severe or worsening, seek emergency help (call 112)."
+            )
 
-        results = score_conditions(selected)
         st.markdown("### Possible Matches")
-        found_any = False
-        for cond, score, advice, threshold in results:
-            if score >= threshold:
-                found_any = True
-                with st.expander(f"{cond} — Score {score} (threshold {threshold})", expanded=False):
-                    st.write(advice)
-        if not found_any:
+        matches_md = "\n\n".join(
+            f"**{cond}** — Score {score} (threshold {threshold})\n\n{advice}"
+            for cond, score, advice, threshold in results if score >= threshold
+        )
+        if matches_md:
+            st.markdown(matches_md)
+        else:
             st.info("No strong match. Monitor symptoms, rest, hydrate, and consult a clinician if they persist or worsen.")
         st.caption("This tool is informational and not a diagnosis. When in doubt, contact a health professional.")
 
@@ -445,7 +600,11 @@ elif menu == "Symptom Checker":
 elif menu == "Health Library":
     st.subheader("📚 Health Library (Offline)")
     query = st.text_input("Search topics or keywords", placeholder="e.g., Malaria, burns, hydration")
-    matches = search_library(query)
+    lib_key = (query or "").strip().lower()
+    if st.session_state.get("_lib_key") != lib_key:
+        st.session_state._lib_key = lib_key
+        st.session_state._lib_res = search_library(lib_key)
+    matches = st.session_state._lib_res
     categories = ["All"] + list(HEALTH_LIBRARY.keys())
     cat_choice = st.selectbox("Filter by category", categories)
     if cat_choice != "All":
@@ -514,22 +673,33 @@ elif menu == "Medication Reminder":
 
     if reminders:
         st.markdown("### Your Reminders")
-        for i, r in enumerate(reminders):
-            with st.container():
-                st.write(f"**{r.get('name','(Unnamed)')}** — {r.get('dosage','')}")
-                st.write(f"⏰ Time: **{r.get('time','')}**  |  📅 Frequency: **{r.get('frequency','Daily')}**")
-                colA, colB = st.columns(2)
-                with colA:
-                    if st.button("Delete", key=f"del_{i}"):
-                        del reminders[i]
-                        save_reminders(reminders)
-                        st.rerun()
-                with colB:
-                    now = dt.datetime.now()
-                    if is_due_now(r, now):
-                        st.warning("🔔 Due now")
-                    else:
-                        st.caption("Not due at this moment.")
+        due = due_mask(reminder_minutes(reminders), dt.datetime.now())
+        # one table plus one delete control instead of a block of widgets per reminder
+        st.dataframe(
+            [
+                {
+                    "Medicine": r.get("name","(Unnamed)"),
+                    "Dosage / Note": r.get("dosage",""),
+                    "Time": r.get("time",""),
+                    "Frequency": r.get("frequency","Daily"),
+                    "Due": "🔔 Due now" if d else "",
+                }
+                for r, d in zip(reminders, due)
+            ],
+            hide_index=True,
+        )
+        colA, colB = st.columns([3, 1])
+        with colA:
+            del_idx = st.selectbox(
+                "Delete which?",
+                range(len(reminders)),
+                format_func=lambda i: f"{reminders[i].get('name','(Unnamed)')} at {reminders[i].get('time','')}",
+            )
+        with colB:
+            if st.button("Delete"):
+                del reminders[del_idx]
+                save_reminders(reminders)
+                st.rerun()
     else:
         st.info("No reminders yet.")
     st.caption("Tip: For audible alerts, add the same time to your phone’s Clock/Calendar.")
@@ -597,12 +767,12 @@ elif menu == "Emergency":
     st.subheader("📨 Send an Emergency Message (WhatsApp or SMS)")
     st.caption("Works best on a phone. On desktop, links open your default apps if available.")
 
-    contact_names = [f"{c['name']} ({c['type']})" for c in contacts]
-    if not contact_names:
+    contact_by_name = {f"{c['name']} ({c['type']})": c for c in contacts}
+    if not contact_by_name:
         st.warning("Add at least one contact above to send messages.")
     else:
-        sel = st.selectbox("Select contact", contact_names)
-        selected_contact = contacts[contact_names.index(sel)]
+        sel = st.selectbox("Select contact", list(contact_by_name))
+        selected_contact = contact_by_name[sel]
 
         col1, col2 = st.columns(2)
         with col1:
@@ -620,16 +790,17 @@ elif menu == "Emergency":
         final_msg = build_message(user_msg, lat, lon)
         st.write("**Preview:**")
         st.code(final_msg)
+        quoted_msg = quote_message(final_msg)
 
         colW, colS, colT = st.columns(3)
         with colW:
-            wa_url = whatsapp_link(selected_contact.get("whatsapp",""), final_msg)
+            wa_url = whatsapp_link(selected_contact.get("whatsapp",""), quoted_msg)
             if wa_url:
                 st.markdown(f"[🟢 Send via WhatsApp]({wa_url})")
             else:
                 st.caption("Add a WhatsApp number to this contact to enable WhatsApp messaging.")
         with colS:
-            sms_url = sms_link(selected_contact.get("phone",""), final_msg)
+            sms_url = sms_link(selected_contact.get("phone",""), quoted_msg)
             if sms_url:
                 st.markdown(f"[✉️ Send via SMS]({sms_url})")
             else: